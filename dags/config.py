@@ -1,6 +1,6 @@
 import os
 import json
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class Constants(BaseModel):
@@ -13,6 +13,12 @@ class Constants(BaseModel):
     STOCK_API_KEY: str
     WEATHER_API_KEY: str
     DB_NAME: str
+    # SQLite attaches at most 10 databases per connection by default
+    DB_SHARDS: int = Field(1, ge=1, le=10)
+    PROFILE: bool = False
+    PROFILE_DIR: str = "profiles"
+    PROFILE_CPROFILE: bool = False
+    PROFILE_MEMORY: bool = True
 
 
 def load_config() -> Constants:
@@ -21,4 +27,7 @@ def load_config() -> Constants:
     file_path = f"{dir_path}/config.json"
     with open(file_path, "r", encoding="utf-8") as f:
         config = json.load(f)
-    return Constants(**config)
+    constants = Constants(**config)
+    # Resolve a relative PROFILE_DIR like config.json, not per worker cwd
+    constants.PROFILE_DIR = os.path.join(dir_path, constants.PROFILE_DIR)
+    return constants
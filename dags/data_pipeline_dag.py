@@ -1,8 +1,10 @@
 import os
+import json
 from pathlib import Path
 from datetime import timedelta
 import pendulum
 from airflow.decorators import dag, task
+from airflow.operators.python import get_current_context
 
 
 from config import load_config
@@ -11,12 +13,35 @@ from tasks.fetch_transform_weather import fetch_transform_weather
 from tasks.load_stock_data import load_stock_data
 from tasks.load_weather_data import load_weather_data
 from tasks.create_joined_table import create_joined_table
+from tasks.profiler import build_run_report, profile_stage, profile_task
 
 default_args = {"retries": 1, "retry_delay": timedelta(seconds=30)}
 
 conf = load_config()
 
 
+def run_profiled(task_id, func, *args, **kwargs):
+    """
+    Run a task callable, profiling its stages when PROFILE is enabled.
+    """
+    if not conf.PROFILE:
+        return func(*args, **kwargs)
+
+    run_id = get_current_context()["run_id"]
+    with profile_task(
+        conf.PROFILE_DIR,
+        run_id,
+        task_id,
+        use_cprofile=conf.PROFILE_CPROFILE,
+        trace_memory=conf.PROFILE_MEMORY,
+    ):
+        result = func(*args, **kwargs)
+        # Approximates Airflow's JSON serialization of the XCom return value
+        with profile_stage("xcom_serialize", "xcom"):
+            json.dumps(result, default=str)
+    return result
+
+
 @dag(
     dag_id=f"{os.path.basename(Path(__file__).parent)}_data_pipeline_dag",
     description="Fetches stock & weather data, transforms, and loads to SQLite",
@@ -36,7 +61,9 @@ def data_pipeline_dag():
 
     @task(task_id="fetch_transform_stock", do_xcom_push=True)
     def fetch_transform_stock_task():
-        return fetch_transform_stock(
+        return run_profiled(
+            "fetch_transform_stock",
+            fetch_transform_stock,
             conf.STOCK_BASE_URL,
             conf.STOCK_API_KEY,
             conf.FUNCTION,
@@ -47,21 +74,49 @@ def data_pipeline_dag():
 
     @task(task_id="fetch_transform_weather", do_xcom_push=True)
     def fetch_transform_weather_task():
-        return fetch_transform_weather(
-            conf.WEATHER_BASE_URL, conf.WEATHER_API_KEY, conf.LOCATION, days=7
+        return run_profiled(
+            "fetch_transform_weather",
+            fetch_transform_weather,
+            conf.WEATHER_BASE_URL,
+            conf.WEATHER_API_KEY,
+            conf.LOCATION,
+            days=7,
         )
 
     @task(task_id="load_stock_data")
     def load_stock_data_task(stock_records):
-        return load_stock_data(conf.DB_NAME, stock_records)
+        return run_profiled(
+            "load_stock_data",
+            load_stock_data,
+            conf.DB_NAME,
+            stock_records,
+            num_shards=conf.DB_SHARDS,
+        )
 
     @task(task_id="load_weather_data")
     def load_weather_data_task(weather_records):
-        return load_weather_data(conf.DB_NAME, weather_records)
+        return run_profiled(
+            "load_weather_data",
+            load_weather_data,
+            conf.DB_NAME,
+            weather_records,
+            location=conf.LOCATION,
+            num_shards=conf.DB_SHARDS,
+        )
 
     @task(task_id="create_joined_table")
     def create_joined_table_task():
-        return create_joined_table(conf.DB_NAME)
+        return run_profiled(
+            "create_joined_table",
+            create_joined_table,
+            conf.DB_NAME,
+            num_shards=conf.DB_SHARDS,
+        )
+
+    @task(task_id="profile_report", trigger_rule="all_done")
+    def profile_report_task():
+        run_id = get_current_context()["run_id"]
+        build_run_report(conf.PROFILE_DIR, run_id)
 
     # DAG Execution Flow
     stock_data_output = fetch_transform_stock_task()
@@ -76,5 +131,8 @@ def data_pipeline_dag():
     weather_data_output >> weather_loaded
     [stock_loaded, weather_loaded] >> joined_table_created
 
+    if conf.PROFILE:
+        joined_table_created >> profile_report_task()
+
 
 data_pipeline_dag = data_pipeline_dag()
@@ -1,39 +1,131 @@
+import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
 
+from tasks.profiler import profile_stage
+from tasks.sharding import attach_shards, shard_db_names, union_query
 
-def create_joined_table(db_name: str) -> None:
+WEATHER_COLUMNS = ["date", "temperature", "humidity", "precipitation", "wind_speed"]
+
+JOIN_QUERY = """
+    CREATE TABLE main.joined_data AS
+    SELECT
+        s.date AS stock_date,
+        s.open,
+        s.high,
+        s.low,
+        s.close,
+        s.volume,
+        s.stock_symbol,
+        s.partition_hour,
+        w.temperature,
+        w.humidity,
+        w.precipitation,
+        w.wind_speed
+    FROM main.stock_data s
+    JOIN {weather_table} w
+    ON s.date = w.date;
+"""
+
+
+def _write_joined_table(
+    conn: sqlite3.Connection, db_name: str, weather_table: str
+) -> None:
     """
-    Create a joined table from stock_data and weather_data in the SQLite DB.
+    Replace main.joined_data in a single transaction, so a failure keeps the
+    previous table. A stale joined_data is dropped when there is nothing to join.
     """
-    conn = sqlite3.connect(db_name)
     cursor = conn.cursor()
     try:
-        cursor.execute("DROP TABLE IF EXISTS joined_data;")
-
-        join_query = """
-            CREATE TABLE joined_data AS
-            SELECT
-                s.date AS stock_date,
-                s.open,
-                s.high,
-                s.low,
-                s.close,
-                s.volume,
-                s.stock_symbol,
-                s.partition_hour,
-                w.temperature,
-                w.humidity,
-                w.precipitation,
-                w.wind_speed
-            FROM stock_data s
-            JOIN weather_data w
-            ON s.date = w.date;
-        """
-        cursor.execute(join_query)
-        conn.commit()
-        print("Created joined_data table.")
-    except Exception as e:
-        print(f"Error creating joined_data table: {e}")
+        has_stock = bool(union_query(conn, "stock_data", ["main"]))
+        cursor.execute("BEGIN IMMEDIATE;")
+        try:
+            cursor.execute("DROP TABLE IF EXISTS main.joined_data;")
+            if has_stock and weather_table:
+                cursor.execute(JOIN_QUERY.format(weather_table=weather_table))
+            cursor.execute("COMMIT;")
+        except Exception:
+            cursor.execute("ROLLBACK;")
+            raise
     finally:
         cursor.close()
+
+    if has_stock and weather_table:
+        print(f"Created joined_data table in '{db_name}'.")
+    else:
+        print(f"No stock or weather data in '{db_name}', dropped joined_data.")
+
+
+def _read_weather(db_names: List[str]) -> List[Tuple]:
+    """
+    Read weather_data from every shard once, before any shard is written.
+    """
+    conn = sqlite3.connect(":memory:")
+    try:
+        aliases = attach_shards(conn, db_names)
+        weather_query = union_query(conn, "weather_data", aliases)
+        if not weather_query:
+            return []
+        columns = ", ".join(WEATHER_COLUMNS)
+        return conn.execute(f"SELECT {columns} FROM ({weather_query});").fetchall()
+    finally:
         conn.close()
+
+
+def _create_joined_table_in_shard(db_name: str, weather_rows: List[Tuple]) -> None:
+    """
+    Create joined_data in one shard from its stock_data and the weather rows
+    of every shard, since weather is sharded by location rather than symbol.
+    The weather rows are loaded into a TEMP table, so no sibling shard is read
+    while this shard is written.
+    """
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    try:
+        weather_table = ""
+        if weather_rows:
+            columns = ", ".join(WEATHER_COLUMNS)
+            placeholders = ", ".join("?" for _ in WEATHER_COLUMNS)
+            conn.execute("BEGIN;")
+            conn.execute(f"CREATE TEMP TABLE weather_snapshot ({columns});")
+            conn.executemany(
+                f"INSERT INTO temp.weather_snapshot VALUES ({placeholders});",
+                weather_rows,
+            )
+            conn.execute("COMMIT;")
+            weather_table = "temp.weather_snapshot"
+        _write_joined_table(conn, db_name, weather_table)
+    finally:
+        conn.close()
+
+
+def create_joined_table(db_name: str, num_shards: int = 1) -> None:
+    """
+    Create a joined table from stock_data and weather_data in the SQLite DB.
+    With `num_shards` > 1, each shard builds its own joined_data in parallel.
+    """
+    db_names = shard_db_names(db_name, num_shards)
+    with profile_stage("create_joined_table", "sqlite"):
+        if len(db_names) == 1:
+            conn = sqlite3.connect(db_name, isolation_level=None)
+            try:
+                has_weather = bool(union_query(conn, "weather_data", ["main"]))
+                weather_table = "main.weather_data" if has_weather else ""
+                _write_joined_table(conn, db_name, weather_table)
+            finally:
+                conn.close()
+            return
+
+        db_names = [name for name in db_names if os.path.exists(name)]
+        if not db_names:
+            print(f"No shards of '{db_name}' exist, skipping joined_data.")
+            return
+
+        weather_rows = _read_weather(db_names)
+        with ThreadPoolExecutor(max_workers=len(db_names)) as executor:
+            list(
+                executor.map(
+                    lambda name: _create_joined_table_in_shard(name, weather_rows),
+                    db_names,
+                )
+            )
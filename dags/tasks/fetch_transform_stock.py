@@ -3,6 +3,8 @@ from typing import Dict, Any
 import requests
 import pandas as pd
 
+from tasks.profiler import profile_stage
+
 
 def fetch_transform_stock(
     stock_base_url: str,
@@ -23,9 +25,11 @@ def fetch_transform_stock(
     }
 
     try:
-        resp = requests.get(stock_base_url, params=params, timeout=60)
-        resp.raise_for_status()
-        stock_json = resp.json()
+        with profile_stage("http_get", "http"):
+            resp = requests.get(stock_base_url, params=params, timeout=60)
+            resp.raise_for_status()
+        with profile_stage("parse_json", "json"):
+            stock_json = resp.json()
     except requests.RequestException as e:
         print(f"Error fetching stock data: {e}")
         return {"records": []}
@@ -34,22 +38,25 @@ def fetch_transform_stock(
         print("Malformed stock data: 'Time Series (Daily)' missing.")
         return {"records": []}
 
-    stock_symbol = stock_json["Meta Data"].get("2. Symbol", "UNKNOWN")
-    time_series = stock_json["Time Series (Daily)"]
+    with profile_stage("transform", "pandas"):
+        stock_symbol = stock_json["Meta Data"].get("2. Symbol", "UNKNOWN")
+        time_series = stock_json["Time Series (Daily)"]
+
+        df = pd.DataFrame.from_dict(time_series, orient="index")
+        df.columns = ["open", "high", "low", "close", "volume"]
 
-    df = pd.DataFrame.from_dict(time_series, orient="index")
-    df.columns = ["open", "high", "low", "close", "volume"]
+        numeric_cols = ["open", "high", "low", "close", "volume"]
+        for col in numeric_cols:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
 
-    numeric_cols = ["open", "high", "low", "close", "volume"]
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+        df["stock_symbol"] = stock_symbol
+        df.reset_index(inplace=True)
+        df.rename(columns={"index": "date"}, inplace=True)
 
-    df["stock_symbol"] = stock_symbol
-    df.reset_index(inplace=True)
-    df.rename(columns={"index": "date"}, inplace=True)
+        df = df.head(days_to_keep)
 
-    df = df.head(days_to_keep)
+        df["partition_hour"] = datetime.now().strftime("%Y%m%d%H")
 
-    df["partition_hour"] = datetime.now().strftime("%Y%m%d%H")
+        records = df.to_dict(orient="records")
 
-    return {"records": df.to_dict(orient="records")}
+    return {"records": records}
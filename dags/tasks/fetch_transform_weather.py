@@ -2,6 +2,8 @@ from datetime import datetime, timedelta
 from typing import Dict, Any
 import requests
 
+from tasks.profiler import profile_stage
+
 
 def fetch_transform_weather(
     weather_base_url: str, weather_api_key: str, location: str, days: int = 7
@@ -22,9 +24,11 @@ def fetch_transform_weather(
 
         # Fetch
         try:
-            resp = requests.get(weather_base_url, params=params, timeout=60)
-            resp.raise_for_status()
-            weather_json = resp.json()
+            with profile_stage("http_get", "http"):
+                resp = requests.get(weather_base_url, params=params, timeout=60)
+                resp.raise_for_status()
+            with profile_stage("parse_json", "json"):
+                weather_json = resp.json()
         except requests.RequestException as e:
             print(f"Error fetching weather data for {date_str}: {e}")
             continue
@@ -1,21 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 import sqlite3
 import pandas as pd
 
+from tasks.profiler import profile_stage
+from tasks.sharding import shard_db_name
 
-def load_stock_data(db_name: str, stock_records: Dict[str, Any]) -> None:
+
+def _write_shard(shard_name: str, shard_df: pd.DataFrame) -> None:
+    conn = sqlite3.connect(shard_name)
+    try:
+        shard_df.to_sql("stock_data", conn, if_exists="append", index=False)
+        print(f"Loaded {len(shard_df)} records into '{shard_name}' 'stock_data'.")
+    finally:
+        conn.close()
+
+
+def load_stock_data(
+    db_name: str, stock_records: Dict[str, Any], num_shards: int = 1
+) -> None:
     """
     Load stock data into SQLite (table: stock_data).
+    With `num_shards` > 1, rows are routed to shard files by symbol and
+    each shard file is written from its own thread.
     """
     records = stock_records.get("records", [])
     if not records:
         print("No stock records to load.")
         return
 
-    df = pd.DataFrame(records)
-    conn = sqlite3.connect(db_name)
-    try:
-        df.to_sql("stock_data", conn, if_exists="append", index=False)
-        print(f"Loaded {len(df)} records into 'stock_data'.")
-    finally:
-        conn.close()
+    with profile_stage("build_dataframe", "pandas"):
+        df = pd.DataFrame(records)
+
+    if num_shards <= 1:
+        with profile_stage("to_sql", "sqlite"):
+            _write_shard(db_name, df)
+        return
+
+    with profile_stage("group_shards", "pandas"):
+        shard_names = df["stock_symbol"].map(
+            lambda symbol: shard_db_name(db_name, str(symbol), num_shards)
+        )
+        shards = list(df.groupby(shard_names, sort=False))
+
+    with profile_stage("to_sql", "sqlite"):
+        if len(shards) == 1:
+            _write_shard(*shards[0])
+            return
+
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            list(executor.map(lambda shard: _write_shard(*shard), shards))
@@ -2,20 +2,36 @@ from typing import Dict, Any
 import sqlite3
 import pandas as pd
 
+from tasks.profiler import profile_stage
+from tasks.sharding import shard_db_name
 
-def load_weather_data(db_name: str, weather_records: Dict[str, Any]) -> None:
+
+def load_weather_data(
+    db_name: str,
+    weather_records: Dict[str, Any],
+    location: str = "",
+    num_shards: int = 1,
+) -> None:
     """
     Load weather data into SQLite (table: weather_data).
+    With `num_shards` > 1, the shard file is chosen from `location`,
+    which must then be given.
     """
+    if num_shards > 1 and not location:
+        raise ValueError("location is required when num_shards > 1.")
+
     records = weather_records.get("records", [])
     if not records:
         print("No weather records to load.")
         return
 
-    df = pd.DataFrame(records)
-    conn = sqlite3.connect(db_name)
+    with profile_stage("build_dataframe", "pandas"):
+        df = pd.DataFrame(records)
+    shard_name = shard_db_name(db_name, location, num_shards)
+    conn = sqlite3.connect(shard_name)
     try:
-        df.to_sql("weather_data", conn, if_exists="append", index=False)
-        print(f"Loaded {len(df)} records into 'weather_data'.")
+        with profile_stage("to_sql", "sqlite"):
+            df.to_sql("weather_data", conn, if_exists="append", index=False)
+        print(f"Loaded {len(df)} records into '{shard_name}' 'weather_data'.")
     finally:
         conn.close()
@@ -0,0 +1,270 @@
+import argparse
+import cProfile
+import json
+import os
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+REPORT_FILE = "report.json"
+
+_NO_OP = nullcontext()
+
+
+class StageProfiler:
+    """
+    Collect wall time, CPU time and, with `track_memory`, tracemalloc peak for
+    the stages of one task. Stages may nest; a parent's memory peak includes
+    its children's. `track_memory` must only be set when this profiler owns the
+    trace, since each stage resets the tracemalloc peak.
+    """
+
+    def __init__(self, task_id: str, track_memory: bool = False) -> None:
+        self.task_id = task_id
+        self.track_memory = track_memory
+        self.stages: List[Dict[str, Any]] = []
+        self._peaks: List[int] = []
+
+    @contextmanager
+    def stage(self, name: str, stage_type: str) -> Iterator[None]:
+        start_mem = 0
+        if self.track_memory:
+            if self._peaks:
+                self._peaks[-1] = max(
+                    self._peaks[-1], tracemalloc.get_traced_memory()[1]
+                )
+            tracemalloc.reset_peak()
+            start_mem = tracemalloc.get_traced_memory()[0]
+            self._peaks.append(0)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+            mem_peak = None
+            if self.track_memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                mem_peak = max(peak - start_mem, 0)
+            self.stages.append(
+                {
+                    "name": name,
+                    "type": stage_type,
+                    "wall_s": wall,
+                    "cpu_s": cpu,
+                    "mem_peak_bytes": mem_peak,
+                }
+            )
+
+
+_active: Optional[StageProfiler] = None
+
+
+def profile_stage(name: str, stage_type: str):
+    """
+    Time a stage against the active task profiler; a no-op when profiling is off.
+    """
+    if _active is None:
+        return _NO_OP
+    return _active.stage(name, stage_type)
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", value)
+
+
+@contextmanager
+def profile_task(
+    profile_dir: str,
+    run_id: str,
+    task_id: str,
+    use_cprofile: bool = False,
+    trace_memory: bool = True,
+) -> Iterator[StageProfiler]:
+    """
+    Profile one task and write its stages to <profile_dir>/<run_id>/<task_id>.json,
+    where <run_id> has characters outside [A-Za-z0-9_.-] replaced by "_".
+    With `use_cprofile`, a cProfile dump is written next to it as <task_id>.prof.
+    With `trace_memory`, tracemalloc peaks are recorded unless tracemalloc is
+    already running for someone else.
+    Failures of the profiler itself are printed and never fail the task.
+    """
+    global _active  # pylint: disable=global-statement
+
+    run_dir = os.path.join(profile_dir, _safe_name(run_id))
+    try:
+        os.makedirs(run_dir, exist_ok=True)
+    except OSError as e:
+        print(f"Error creating profile directory '{run_dir}': {e}")
+
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if trace_memory and not started_tracing:
+        print(f"tracemalloc is already running, not tracking memory for '{task_id}'.")
+    if started_tracing:
+        tracemalloc.start()
+    profiler = StageProfiler(task_id, track_memory=started_tracing)
+    cprof = None
+    if use_cprofile:
+        cprof = cProfile.Profile()
+        try:
+            cprof.enable()
+        except ValueError as e:
+            print(f"Error enabling cProfile for '{task_id}': {e}")
+            cprof = None
+    _active = profiler
+    try:
+        with profiler.stage(task_id, "task"):
+            yield profiler
+    finally:
+        _active = None
+        if started_tracing:
+            tracemalloc.stop()
+        if cprof:
+            cprof.disable()
+            try:
+                cprof.dump_stats(os.path.join(run_dir, f"{task_id}.prof"))
+            except OSError as e:
+                print(f"Error writing cProfile dump for '{task_id}': {e}")
+        try:
+            with open(
+                os.path.join(run_dir, f"{task_id}.json"), "w", encoding="utf-8"
+            ) as f:
+                json.dump({"task_id": task_id, "stages": profiler.stages}, f, indent=2)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing profile for '{task_id}': {e}")
+
+
+def _add(totals: Dict[str, Dict[str, Any]], key: str, stage: Dict[str, Any]) -> None:
+    entry = totals.setdefault(
+        key, {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "mem_peak_bytes": 0}
+    )
+    entry["count"] += 1
+    entry["wall_s"] += stage["wall_s"]
+    entry["cpu_s"] += stage["cpu_s"]
+    if stage["mem_peak_bytes"] is not None:
+        entry["mem_peak_bytes"] = max(entry["mem_peak_bytes"], stage["mem_peak_bytes"])
+
+
+def build_run_report(profile_dir: str, run_id: str) -> Dict[str, Any]:
+    """
+    Merge the per-task stage files of a run into <profile_dir>/<run_id>/report.json,
+    broken down per task, per stage and per stage type.
+    """
+    run_dir = os.path.join(profile_dir, _safe_name(run_id))
+    tasks: Dict[str, List[Dict[str, Any]]] = {}
+    if not os.path.isdir(run_dir):
+        print(
+            f"No profile directory '{run_dir}' for run '{run_id}'; "
+            "PROFILE_DIR must be a path shared by all workers."
+        )
+        return {"run_id": run_id, "tasks": tasks, "by_stage": {}, "by_type": {}}
+
+    for file_name in sorted(os.listdir(run_dir)):
+        if not file_name.endswith(".json") or file_name == REPORT_FILE:
+            continue
+        try:
+            with open(os.path.join(run_dir, file_name), "r", encoding="utf-8") as f:
+                task_report = json.load(f)
+            tasks[task_report["task_id"]] = task_report["stages"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Skipping unreadable profile '{file_name}': {e}")
+
+    by_stage: Dict[str, Dict[str, Any]] = {}
+    by_type: Dict[str, Dict[str, Any]] = {}
+    for task_id, stages in tasks.items():
+        for stage in stages:
+            _add(by_stage, f"{task_id}.{stage['name']}", stage)
+            _add(by_type, stage["type"], stage)
+
+    report = {
+        "run_id": run_id,
+        "tasks": tasks,
+        "by_stage": by_stage,
+        "by_type": by_type,
+    }
+    with open(os.path.join(run_dir, REPORT_FILE), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote profile report for run '{run_id}' to {run_dir}.")
+    return report
+
+
+def diff_reports(
+    base: Dict[str, Any],
+    head: Dict[str, Any],
+    threshold: float = 0.1,
+    min_wall_s: float = 0.0,
+) -> List[Dict[str, Any]]:
+    """
+    Compare two run reports per stage type and per stage.
+    A row is flagged as a regression when wall time grows by more than `threshold`,
+    or when it is new (or zero) in `base` and takes more than `min_wall_s` in `head`.
+    """
+    rows = []
+    for section in ("by_type", "by_stage"):
+        base_section = base.get(section, {})
+        head_section = head.get(section, {})
+        for key in sorted(set(base_section) | set(head_section)):
+            base_wall = base_section.get(key, {}).get("wall_s", 0.0)
+            head_wall = head_section.get(key, {}).get("wall_s", 0.0)
+            change = (head_wall - base_wall) / base_wall if base_wall else None
+            rows.append(
+                {
+                    "section": section,
+                    "key": key,
+                    "base_wall_s": base_wall,
+                    "head_wall_s": head_wall,
+                    "change": change,
+                    "regression": (
+                        change > threshold
+                        if change is not None
+                        else head_wall > min_wall_s
+                    ),
+                }
+            )
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pipeline profile reports")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subparsers.add_parser("report", help="Build a run report")
+    report_parser.add_argument("profile_dir")
+    report_parser.add_argument("run_id")
+
+    diff_parser = subparsers.add_parser("diff", help="Diff two run reports")
+    diff_parser.add_argument("base")
+    diff_parser.add_argument("head")
+    diff_parser.add_argument("--threshold", type=float, default=0.1)
+    diff_parser.add_argument("--min-wall-s", type=float, default=0.0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "report":
+        build_run_report(args.profile_dir, args.run_id)
+        return 0
+
+    with open(args.base, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, "r", encoding="utf-8") as f:
+        head = json.load(f)
+
+    rows = diff_reports(base, head, args.threshold, args.min_wall_s)
+    for row in rows:
+        change = "n/a" if row["change"] is None else f"{row['change']:+.1%}"
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['section']:<9} {row['key']:<45} "
+            f"{row['base_wall_s']:>9.3f}s {row['head_wall_s']:>9.3f}s "
+            f"{change:>8}{flag}"
+        )
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import zlib
+from typing import List
+
+
+def shard_db_names(db_name: str, num_shards: int = 1) -> List[str]:
+    """
+    Return the database file names for every shard of `db_name`.
+    With a single shard the original database file is used unchanged.
+    """
+    if num_shards <= 1:
+        return [db_name]
+    root, ext = os.path.splitext(db_name)
+    return [f"{root}.shard{i}{ext}" for i in range(num_shards)]
+
+
+def shard_db_name(db_name: str, shard_key: str, num_shards: int = 1) -> str:
+    """
+    Map a shard key (stock symbol or location) to its database file.
+    Uses crc32 so the mapping is stable across worker processes.
+    """
+    names = shard_db_names(db_name, num_shards)
+    return names[zlib.crc32(shard_key.encode("utf-8")) % len(names)]
+
+
+def attach_shards(conn: sqlite3.Connection, db_names: List[str]) -> List[str]:
+    """
+    Attach each database in `db_names` to `conn` and return the schema aliases.
+    """
+    aliases = []
+    for i, name in enumerate(db_names):
+        alias = f"shard{i}"
+        conn.execute(f"ATTACH DATABASE ? AS {alias};", (name,))
+        aliases.append(alias)
+    return aliases
+
+
+def union_query(conn: sqlite3.Connection, table: str, schemas: List[str]) -> str:
+    """
+    Build a UNION ALL query over `table` in every schema that contains it.
+    Returns an empty string if no schema has the table.
+    """
+    selects = []
+    for schema in schemas:
+        found = conn.execute(
+            f"SELECT 1 FROM {schema}.sqlite_master WHERE type='table' AND name=?;",
+            (table,),
+        ).fetchone()
+        if found:
+            selects.append(f"SELECT * FROM {schema}.{table}")
+    return " UNION ALL ".join(selects)
+
+
+def connect_sharded(db_name: str, num_shards: int = 1) -> sqlite3.Connection:
+    """
+    Open a read connection that exposes stock_data, weather_data and joined_data
+    from all shards as temporary union views.
+    """
+    db_names = shard_db_names(db_name, num_shards)
+    if len(db_names) == 1:
+        return sqlite3.connect(db_name)
+
+    conn = sqlite3.connect(":memory:")
+    aliases = attach_shards(conn, db_names)
+    for table in ("stock_data", "weather_data", "joined_data"):
+        query = union_query(conn, table, aliases)
+        if query:
+            conn.execute(f"CREATE TEMP VIEW {table} AS {query};")
+    return conn
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+
+from tasks import profiler
+from tasks.profiler import (
+    build_run_report,
+    diff_reports,
+    profile_stage,
+    profile_task,
+)
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.run_id = "manual__2025-01-03T00:00:00+00:00"
+
+    def tearDown(self):
+        shutil.rmtree(self.profile_dir)
+
+    def test_profile_stage_is_noop_without_active_task(self):
+        """
+        Test that stages outside a profiled task are not recorded.
+        """
+        with profile_stage("http_get", "http"):
+            pass
+        self.assertIsNone(profiler._active)
+
+    def test_build_run_report(self):
+        """
+        Test that per-task stage files are merged into a per-run report.
+        """
+        with profile_task(self.profile_dir, self.run_id, "load_stock_data"):
+            with profile_stage("build_dataframe", "pandas"):
+                _ = [0] * 100000
+            with profile_stage("to_sql", "sqlite"):
+                pass
+        with profile_task(
+            self.profile_dir, self.run_id, "create_joined_table", use_cprofile=True
+        ):
+            with profile_stage("create_joined_table", "sqlite"):
+                pass
+
+        report = build_run_report(self.profile_dir, self.run_id)
+
+        run_dir = os.path.join(self.profile_dir, "manual__2025-01-03T00_00_00_00_00")
+        self.assertTrue(os.path.exists(os.path.join(run_dir, "report.json")))
+        self.assertTrue(
+            os.path.exists(os.path.join(run_dir, "create_joined_table.prof"))
+        )
+        self.assertEqual(
+            set(report["tasks"]), {"load_stock_data", "create_joined_table"}
+        )
+        self.assertEqual(report["by_type"]["sqlite"]["count"], 2)
+        self.assertEqual(report["by_type"]["task"]["count"], 2)
+        self.assertGreater(
+            report["by_stage"]["load_stock_data.build_dataframe"]["mem_peak_bytes"], 0
+        )
+        self.assertGreaterEqual(
+            report["by_stage"]["load_stock_data.load_stock_data"]["mem_peak_bytes"],
+            report["by_stage"]["load_stock_data.build_dataframe"]["mem_peak_bytes"],
+        )
+
+    def test_diff_reports_flags_regressions(self):
+        """
+        Test that diff_reports flags stages whose wall time grew past the threshold.
+        """
+        base = {"by_type": {"http": {"wall_s": 1.0}, "sqlite": {"wall_s": 1.0}}}
+        head = {"by_type": {"http": {"wall_s": 2.0}, "sqlite": {"wall_s": 1.05}}}
+
+        rows = {row["key"]: row for row in diff_reports(base, head, threshold=0.1)}
+
+        self.assertTrue(rows["http"]["regression"])
+        self.assertFalse(rows["sqlite"]["regression"])
+
+    def test_diff_reports_flags_new_stages(self):
+        """
+        Test that stages missing from the base report are flagged once they take time.
+        """
+        base = {"by_stage": {"load_stock_data.to_sql": {"wall_s": 0.0}}}
+        head = {
+            "by_stage": {
+                "load_stock_data.to_sql": {"wall_s": 0.5},
+                "load_stock_data.build_dataframe": {"wall_s": 0.001},
+            }
+        }
+
+        rows = {row["key"]: row for row in diff_reports(base, head)}
+        self.assertTrue(rows["load_stock_data.to_sql"]["regression"])
+        self.assertTrue(rows["load_stock_data.build_dataframe"]["regression"])
+
+        rows = {row["key"]: row for row in diff_reports(base, head, min_wall_s=0.01)}
+        self.assertFalse(rows["load_stock_data.build_dataframe"]["regression"])
+
+    def test_build_run_report_missing_run_dir(self):
+        """
+        Test that a run without per-task files yields an empty report instead of failing.
+        """
+        report = build_run_report(self.profile_dir, "missing_run")
+
+        self.assertEqual(report["tasks"], {})
+        self.assertFalse(os.path.exists(os.path.join(self.profile_dir, "missing_run")))
+
+    def test_build_run_report_skips_truncated_task_file(self):
+        """
+        Test that a truncated task file is skipped and the other tasks are reported.
+        """
+        with profile_task(self.profile_dir, self.run_id, "load_stock_data"):
+            pass
+        run_dir = os.path.join(self.profile_dir, "manual__2025-01-03T00_00_00_00_00")
+        with open(
+            os.path.join(run_dir, "load_weather_data.json"), "w", encoding="utf-8"
+        ) as f:
+            f.write('{"task_id": "load_weather_data", "stages": [')
+
+        report = build_run_report(self.profile_dir, self.run_id)
+
+        self.assertEqual(set(report["tasks"]), {"load_stock_data"})
+
+    def test_profile_task_keeps_foreign_tracemalloc_peak(self):
+        """
+        Test that an existing tracemalloc trace is neither reset nor stopped.
+        """
+        tracemalloc.start()
+        try:
+            _ = [0] * 100000
+            peak_before = tracemalloc.get_traced_memory()[1]
+            del _
+            with profile_task(self.profile_dir, self.run_id, "load_stock_data"):
+                with profile_stage("to_sql", "sqlite"):
+                    pass
+            self.assertTrue(tracemalloc.is_tracing())
+            self.assertGreaterEqual(tracemalloc.get_traced_memory()[1], peak_before)
+        finally:
+            tracemalloc.stop()
+
+        report = build_run_report(self.profile_dir, self.run_id)
+        stages = report["tasks"]["load_stock_data"]
+        self.assertTrue(all(stage["mem_peak_bytes"] is None for stage in stages))
+
+    def test_profile_task_io_errors_do_not_fail_task(self):
+        """
+        Test that the task still runs when the profile directory cannot be written.
+        """
+        blocked_dir = os.path.join(self.profile_dir, "not_a_dir")
+        with open(blocked_dir, "w", encoding="utf-8") as f:
+            f.write("")
+
+        ran = False
+        with profile_task(blocked_dir, self.run_id, "load_stock_data", True):
+            ran = True
+
+        self.assertTrue(ran)
+        self.assertIsNone(profiler._active)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from tasks.sharding import shard_db_name, shard_db_names, connect_sharded
+from tasks.load_stock_data import load_stock_data
+from tasks.load_weather_data import load_weather_data
+from tasks.create_joined_table import create_joined_table
+
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_name = os.path.join(self.tmp_dir, "test_data.db")
+        self.num_shards = 4
+
+        self.stock_records = {
+            "records": [
+                {
+                    "date": "2023-10-10",
+                    "open": 140.0,
+                    "high": 142.0,
+                    "low": 139.0,
+                    "close": 141.0,
+                    "volume": 3000000,
+                    "stock_symbol": symbol,
+                    "partition_hour": "2023101012",
+                }
+                for symbol in ("IBM", "AAPL", "MSFT", "TSCO.LON", "GOOG")
+            ]
+        }
+        self.weather_records = {
+            "records": [
+                {
+                    "date": "2023-10-10",
+                    "temperature": 15.5,
+                    "humidity": 70,
+                    "precipitation": 5.2,
+                    "wind_speed": 20,
+                }
+            ]
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_single_shard_uses_original_db(self):
+        """
+        Test that sharding is a no-op when only one shard is configured.
+        """
+        self.assertEqual(shard_db_names(self.db_name), [self.db_name])
+        self.assertEqual(shard_db_name(self.db_name, "IBM"), self.db_name)
+
+    def test_shard_db_name_is_stable(self):
+        """
+        Test that a shard key always maps to the same shard file.
+        """
+        names = shard_db_names(self.db_name, self.num_shards)
+        self.assertEqual(len(set(names)), self.num_shards)
+        first = shard_db_name(self.db_name, "IBM", self.num_shards)
+        self.assertIn(first, names)
+        self.assertEqual(first, shard_db_name(self.db_name, "IBM", self.num_shards))
+
+    def test_load_and_join_across_shards(self):
+        """
+        Test that sharded loads are joined per shard and readable through one connection.
+        """
+        load_stock_data(self.db_name, self.stock_records, num_shards=self.num_shards)
+        load_weather_data(
+            self.db_name,
+            self.weather_records,
+            location="London",
+            num_shards=self.num_shards,
+        )
+        create_joined_table(self.db_name, num_shards=self.num_shards)
+
+        self.assertFalse(os.path.exists(self.db_name))
+
+        conn = connect_sharded(self.db_name, num_shards=self.num_shards)
+        try:
+            stock_count = conn.execute("SELECT COUNT(*) FROM stock_data;").fetchone()
+            joined = conn.execute(
+                "SELECT stock_symbol, temperature FROM joined_data;"
+            ).fetchall()
+        finally:
+            conn.close()
+
+        self.assertEqual(stock_count[0], 5)
+        self.assertEqual(
+            sorted(symbol for symbol, _ in joined),
+            sorted(r["stock_symbol"] for r in self.stock_records["records"]),
+        )
+        self.assertTrue(all(temperature == 15.5 for _, temperature in joined))
+
+    def test_join_with_weather_in_several_shards(self):
+        """
+        Test that shards holding both stock and weather data are joined concurrently
+        without lock errors, and that every shard gets a joined_data table.
+        """
+        num_shards = 2
+        dates = [f"d{i:05d}" for i in range(20000)]
+        stock_records = {
+            "records": [
+                {
+                    "date": date,
+                    "open": 140.0,
+                    "high": 142.0,
+                    "low": 139.0,
+                    "close": 141.0,
+                    "volume": 3000000,
+                    "stock_symbol": symbol,
+                    "partition_hour": "2023101012",
+                }
+                for symbol in ("IBM", "AAPL")
+                for date in dates
+            ]
+        }
+        weather_records = {
+            "records": [
+                {
+                    "date": date,
+                    "temperature": 15.5,
+                    "humidity": 70,
+                    "precipitation": 5.2,
+                    "wind_speed": 20,
+                }
+                for date in dates
+            ]
+        }
+        # IBM and London land in one shard, AAPL and Paris in the other
+        self.assertNotEqual(
+            shard_db_name(self.db_name, "London", num_shards),
+            shard_db_name(self.db_name, "Paris", num_shards),
+        )
+
+        load_stock_data(self.db_name, stock_records, num_shards=num_shards)
+        for location in ("London", "Paris"):
+            load_weather_data(
+                self.db_name,
+                weather_records,
+                location=location,
+                num_shards=num_shards,
+            )
+        create_joined_table(self.db_name, num_shards=num_shards)
+
+        for shard_name in shard_db_names(self.db_name, num_shards):
+            conn = sqlite3.connect(shard_name)
+            try:
+                count = conn.execute("SELECT COUNT(*) FROM joined_data;").fetchone()
+            finally:
+                conn.close()
+            self.assertEqual(count[0], 2 * len(dates))
+
+    def test_unsharded_load_accepts_records_without_symbol(self):
+        """
+        Test that unsharded loads do not depend on the stock_symbol column.
+        """
+        load_stock_data(self.db_name, {"records": [{"date": "a", "open": 1}]})
+
+        conn = sqlite3.connect(self.db_name)
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM stock_data;").fetchone()
+        finally:
+            conn.close()
+        self.assertEqual(count[0], 1)
+
+    def test_stale_joined_data_dropped_without_weather(self):
+        """
+        Test that joined_data is dropped rather than left stale when weather is missing.
+        """
+        load_stock_data(self.db_name, self.stock_records)
+        load_weather_data(self.db_name, self.weather_records)
+        create_joined_table(self.db_name)
+
+        conn = sqlite3.connect(self.db_name)
+        try:
+            conn.execute("DROP TABLE weather_data;")
+            conn.commit()
+        finally:
+            conn.close()
+        create_joined_table(self.db_name)
+
+        conn = sqlite3.connect(self.db_name)
+        try:
+            tables = conn.execute(
+                "SELECT name FROM sqlite_master WHERE name='joined_data';"
+            ).fetchall()
+        finally:
+            conn.close()
+        self.assertEqual(tables, [])
+
+    def test_load_weather_data_requires_location_when_sharded(self):
+        """
+        Test that sharded weather loads refuse to guess a shard without a location.
+        """
+        with self.assertRaises(ValueError):
+            load_weather_data(
+                self.db_name, self.weather_records, num_shards=self.num_shards
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()